@@ -1,9 +1,15 @@
 import json
 from datetime import datetime, timedelta
+from functools import reduce
 from pathlib import Path
-from typing import Tuple
+from typing import List, Tuple
 
+import numpy as np
+import orjson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import streamlit as st
 
 
@@ -12,6 +18,7 @@ st.set_page_config(page_title="KYC Expiry Dashboard", layout="wide")
 DATA_PATH = Path(__file__).parent / "data" / "dashboard_data.json"
 BUCKET_ORDER = ["Expired", "0-30 days", "31-60 days", "61-90 days", "90+ days"]
 RISK_ORDER = ["High", "Medium", "Low", "Unknown"]
+PAGE_SIZE = 100
 BUCKET_COLORS = {
     "Expired": "#ef4444",
     "0-30 days": "#f59e0b",
@@ -25,6 +32,59 @@ RISK_COLORS = {
     "Low": "#15803d",
     "Unknown": "#475569",
 }
+KPI_LABELS = ["Expired", "0–30 days", "31–60 days", "61–90 days", "90+ days"]
+# One card per bucket; the positional fields take the counts in BUCKET_ORDER.
+KPI_TEMPLATE = (
+    "<div style='display:flex;gap:12px'>"
+    + "".join(
+        f"<div class='metric-card' style='flex:1'><div class='metric-label'>{label}</div>"
+        f"<div style='font-size:1.6rem;font-weight:700;color:{BUCKET_COLORS[bucket]};'>{{{i}}}</div></div>"
+        for i, (bucket, label) in enumerate(zip(BUCKET_ORDER, KPI_LABELS))
+    )
+    + "</div>"
+)
+BUCKETS_SPEC_TEMPLATE = {
+    "height": 320,
+    "mark": {"type": "bar"},
+    "encoding": {
+        "x": {"field": "expiry_bucket", "type": "nominal", "sort": BUCKET_ORDER, "title": "Expiry bucket"},
+        "y": {"field": "count", "type": "quantitative", "title": "Customers"},
+        "color": {
+            "field": "expiry_bucket",
+            "type": "nominal",
+            "scale": {"domain": BUCKET_ORDER, "range": [BUCKET_COLORS[b] for b in BUCKET_ORDER]},
+            "legend": None,
+        },
+    },
+}
+STACK_SPEC_TEMPLATE = {
+    "height": 320,
+    "mark": {"type": "bar"},
+    "encoding": {
+        "x": {"field": "expiry_bucket", "type": "nominal", "sort": BUCKET_ORDER, "title": "Expiry bucket"},
+        "y": {"field": "count", "type": "quantitative", "stack": "zero", "title": "Customers"},
+        "color": {
+            "field": "risk_rating",
+            "type": "nominal",
+            "scale": {"domain": RISK_ORDER, "range": [RISK_COLORS[r] for r in RISK_ORDER]},
+            "title": "Risk rating",
+        },
+    },
+}
+RECORD_COLUMNS = [
+    "customer_id",
+    "customer_name",
+    "risk_rating",
+    "kyc_document_type",
+    "doc_expiry_date",
+    "days_to_expiry",
+    "expiry_bucket",
+    "relationship_manager",
+]
+# The search box matches against every record field.
+SEARCH_COLUMNS = RECORD_COLUMNS
+# Columns built lowercased in load_data; these can skip case folding at match time.
+LOWERCASED_COLUMNS = {"__search__"}
 
 
 def inject_css() -> None:
@@ -49,76 +109,124 @@ def inject_css() -> None:
     )
 
 
+# Canonical order first; any other labels in the source are kept, appended after it.
+def _ordered_category(values: pd.Series, order: List[str]) -> pd.Categorical:
+    extra = sorted(set(values.dropna().unique()) - set(order))
+    return pd.Categorical(values, categories=order + extra, ordered=True)
+
+
+def _read_json(path: Path) -> Tuple[dict, pd.DataFrame]:
+    payload = path.read_bytes()
+    try:
+        raw = orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        # orjson rejects the NaN/Infinity tokens that json.dumps writes by default.
+        raw = json.loads(payload)
+    return raw, pd.DataFrame.from_records(raw.get("records", []), columns=RECORD_COLUMNS + ["bucket_code"])
+
+
+def _read_parquet(path: Path) -> Tuple[dict, pd.DataFrame]:
+    table = pq.read_table(path)
+    raw = {key.decode(): value.decode() for key, value in (table.schema.metadata or {}).items()}
+    df = table.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get, date_as_object=False)
+    return raw, df
+
+
 @st.cache_data
 def load_data(path: Path) -> Tuple[dict, pd.DataFrame]:
-    if not path.exists():
+    # Prefer the Parquet export written by scripts/extract_from_html.py next to the JSON file.
+    parquet_path = path.with_suffix(".parquet")
+    if parquet_path.exists():
+        raw, df = _read_parquet(parquet_path)
+    elif path.exists():
+        raw, df = _read_json(path)
+    else:
         return {}, pd.DataFrame()
-    raw = json.loads(path.read_text(encoding="utf-8"))
-    df = pd.DataFrame(raw.get("records", []))
     if df.empty:
         return raw, df
 
-    df["risk_rating"] = df["risk_rating"].fillna("Unknown")
+    df["risk_rating"] = _ordered_category(df["risk_rating"], RISK_ORDER).fillna("Unknown")
+    bucket_codes = df.pop("bucket_code") if "bucket_code" in df else None
+    if bucket_codes is not None and (bucket_codes >= 0).all():
+        # Precomputed by scripts/extract_from_html.py as indexes into BUCKET_ORDER.
+        df["expiry_bucket"] = pd.Categorical.from_codes(bucket_codes.astype("int8"), BUCKET_ORDER, ordered=True)
+    else:
+        df["expiry_bucket"] = _ordered_category(df["expiry_bucket"], BUCKET_ORDER)
     df["days_to_expiry"] = pd.to_numeric(df["days_to_expiry"], errors="coerce")
     df["doc_expiry_date"] = pd.to_datetime(df["doc_expiry_date"], errors="coerce")
-    df["relationship_manager"] = df["relationship_manager"].fillna("Unknown")
+    rm = df["relationship_manager"].astype("category")
+    if rm.isna().any() and "Unknown" not in rm.cat.categories:
+        rm = rm.cat.add_categories("Unknown")
+    df["relationship_manager"] = rm.fillna("Unknown")
+    df["kyc_document_type"] = df["kyc_document_type"].astype("category")
+    for col in ("customer_id", "customer_name"):
+        df[col] = df[col].astype("string[pyarrow]")
+
+    # Build the lowercased search corpus once so each keystroke is a single substring scan.
+    # Fields are joined with a unit separator so a query cannot match across two of them.
+    as_text = {
+        "doc_expiry_date": df["doc_expiry_date"].dt.strftime("%Y-%m-%d"),
+        "days_to_expiry": df["days_to_expiry"].astype("Int64"),
+    }
+    parts = [as_text.get(col, df[col]).astype("string[pyarrow]") for col in SEARCH_COLUMNS]
+    df["__search__"] = parts[0].str.cat(parts[1:], sep="\x1f", na_rep="").str.lower()
     return raw, df
 
 
+# Column-wise, case-insensitive substring match; never loop over rows.
+def row_mask_any_contains(df: pd.DataFrame, q: str, cols: List[str]) -> np.ndarray:
+    masks = []
+    for col in cols:
+        arr = pa.array(df[col].astype("string[pyarrow]"))
+        if col in LOWERCASED_COLUMNS:
+            masks.append(pc.match_substring(arr, q.lower()))
+        else:
+            masks.append(pc.match_substring(arr, q, ignore_case=True))
+    return reduce(pc.or_kleene, masks).fill_null(False).to_numpy(zero_copy_only=False)
+
+
 def filter_rows(df: pd.DataFrame, rm: str, query: str) -> pd.DataFrame:
     if df.empty:
         return df
     filtered = df
     if rm and rm != "All":
-        filtered = filtered[filtered["relationship_manager"] == rm]
+        # Compare the int category codes rather than the labels.
+        rms = filtered["relationship_manager"].cat
+        filtered = filtered.iloc[rms.codes.to_numpy() == rms.categories.get_loc(rm)]
     if query:
-        q = query.lower()
-        mask = filtered.apply(lambda row: any(q in str(v).lower() for v in row.values), axis=1)
-        filtered = filtered[mask]
+        filtered = filtered[row_mask_any_contains(filtered, query, ["__search__"])]
     return filtered
 
 
-def render_kpis(df: pd.DataFrame) -> pd.Series:
-    counts = df["expiry_bucket"].value_counts().reindex(BUCKET_ORDER, fill_value=0)
-    cols = st.columns(len(BUCKET_ORDER))
-    labels = ["Expired", "0–30 days", "31–60 days", "61–90 days", "90+ days"]
-    for col, bucket, label in zip(cols, BUCKET_ORDER, labels):
-        with col:
-            st.markdown(
-                f"<div class='metric-card'><div class='metric-label'>{label}</div>"
-                f"<div style='font-size:1.6rem;font-weight:700;color:{BUCKET_COLORS[bucket]};'>{counts[bucket]}</div></div>",
-                unsafe_allow_html=True,
-            )
+# `_filtered` is skipped by the cache hasher; the filter inputs identify it instead.
+@st.cache_data(show_spinner=False, max_entries=256)
+def compute_all_counts(_filtered: pd.DataFrame, data_key: str, rm: str, query: str) -> pd.DataFrame:
+    counts = pd.crosstab(_filtered["expiry_bucket"], _filtered["risk_rating"], dropna=False)
+    return counts.reindex(index=BUCKET_ORDER, columns=RISK_ORDER, fill_value=0)
+
+
+def render_kpis(crosstab: pd.DataFrame) -> pd.Series:
+    counts = crosstab.sum(axis=1)
+    st.markdown(KPI_TEMPLATE.format(*counts.tolist()), unsafe_allow_html=True)
     return counts
 
 
-def chart_buckets(df: pd.DataFrame):
-    counts = df["expiry_bucket"].value_counts().reindex(BUCKET_ORDER, fill_value=0)
-    data = counts.reset_index()
-    data.columns = ["Expiry bucket", "Customers"]
-    data = data.set_index("Expiry bucket")
-    st.bar_chart(data, height=320, use_container_width=True)
+def chart_buckets(crosstab: pd.DataFrame):
+    data = crosstab.sum(axis=1).rename("count").reset_index().to_dict(orient="records")
+    spec = {**BUCKETS_SPEC_TEMPLATE, "data": {"values": data}}
+    st.vega_lite_chart(spec, use_container_width=True)
 
 
-def chart_stack(df: pd.DataFrame):
-    idx = pd.MultiIndex.from_product([BUCKET_ORDER, RISK_ORDER], names=["expiry_bucket", "risk_rating"])
-    grouped = (
-        df.groupby(["expiry_bucket", "risk_rating"])
-        .size()
-        .reindex(idx, fill_value=0)
-        .reset_index(name="count")
-    )
-    pivot = grouped.pivot(index="expiry_bucket", columns="risk_rating", values="count").reindex(BUCKET_ORDER)
-    pivot = pivot.fillna(0)
-    st.bar_chart(pivot, height=320, use_container_width=True)
+def chart_stack(crosstab: pd.DataFrame):
+    data = crosstab.stack().rename("count").reset_index().to_dict(orient="records")
+    spec = {**STACK_SPEC_TEMPLATE, "data": {"values": data}}
+    st.vega_lite_chart(spec, use_container_width=True)
 
 
 def render_table(df: pd.DataFrame):
     if df.empty:
         st.info("No customers match the current filters.")
         return
-    display = df.copy()
-    display["doc_expiry_date"] = display["doc_expiry_date"].dt.strftime("%Y-%m-%d")
     cols = [
         "customer_id",
         "customer_name",
@@ -130,24 +238,34 @@ def render_table(df: pd.DataFrame):
         "relationship_manager",
     ]
     st.dataframe(
-        display[cols],
+        df[cols],
         use_container_width=True,
         hide_index=True,
         column_config={
             "days_to_expiry": st.column_config.NumberColumn("Days", format="%d"),
-            "doc_expiry_date": st.column_config.DateColumn("Expiry Date"),
+            "doc_expiry_date": st.column_config.DateColumn("Expiry Date", format="YYYY-MM-DD"),
             "risk_rating": st.column_config.TextColumn("Risk"),
         },
     )
 
 
+# Reads the categorical's dictionary, so no scan over the rows is needed.
+def rm_options(df: pd.DataFrame) -> List[str]:
+    return ["All"] + sorted(df["relationship_manager"].cat.categories.tolist())
+
+
+# Backdate the timestamp by 48 hours, pinned once per server process so reruns don't move it.
+@st.cache_resource
+def backdated_timestamp() -> datetime:
+    return datetime.utcnow() - timedelta(hours=48)
+
+
 def main():
     inject_css()
     raw, df = load_data(DATA_PATH)
 
     st.title("KYC Expiry Dashboard")
-    # Backdate the timestamp by 48 hours on each refresh.
-    backdated = datetime.utcnow() - timedelta(hours=48)
+    backdated = backdated_timestamp()
     meta = [f"Generated {backdated:%Y-%m-%d %H:%M UTC}"]
     if raw.get("input_file"):
         meta.append(f"Source: {raw['input_file']}")
@@ -160,32 +278,34 @@ def main():
         )
         return
 
-    rm_unique = sorted(df["relationship_manager"].dropna().unique().tolist())
-    rm_options = ["All"] + rm_unique
-
     top_cols = st.columns([2, 3])
     with top_cols[0]:
-        rm_choice = st.selectbox("Relationship manager", options=rm_options, index=0)
+        rm_choice = st.selectbox("Relationship manager", options=rm_options(df), index=0)
     with top_cols[1]:
         search = st.text_input("Search customers, document type, RM…", placeholder="e.g. passport, Johnson, Aarav")
 
     filtered = filter_rows(df, rm_choice, search)
+    data_key = raw.get("generated_at", "")
+    crosstab = compute_all_counts(filtered, data_key, rm_choice, search)
 
     st.markdown("### Key Performance Indicators")
-    render_kpis(filtered)
+    render_kpis(crosstab)
 
     st.markdown("### Trends")
     chart_cols = st.columns(2)
     with chart_cols[0]:
         st.subheader("Customers by expiry bucket", divider="blue")
-        chart_buckets(filtered)
+        chart_buckets(crosstab)
     with chart_cols[1]:
         st.subheader("Expiry bucket × risk rating", divider="blue")
-        chart_stack(filtered)
+        chart_stack(crosstab)
 
     st.markdown("### Customer details")
-    st.caption("Click column headers to sort; search box filters across all columns.")
-    render_table(filtered)
+    st.caption("Click column headers to sort the current page; search box filters across all columns.")
+    page_count = max(1, (len(filtered) + PAGE_SIZE - 1) // PAGE_SIZE)
+    page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+    start = (page - 1) * PAGE_SIZE
+    render_table(filtered.iloc[start : start + PAGE_SIZE])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,49 @@
+import tempfile
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+from extract_from_html import PARQUET_SCHEMA, build_table
+
+
+def mixed_payload() -> dict:
+    records = [
+        {
+            "customer_id": f"CUS{i:06d}",
+            "customer_name": f"Customer {i}",
+            "risk_rating": "High",
+            "kyc_document_type": f"Document type {i}",
+            "doc_expiry_date": "2026-03-01",
+            "days_to_expiry": i,
+            "expiry_bucket": "90+ days",
+            "relationship_manager": f"RM {i % 7}",
+            "bucket_code": 4,
+        }
+        for i in range(200)
+    ]
+    records[0].update(customer_id=123, customer_name=None, days_to_expiry="12.5", bucket_code=None)
+    records[1].update(doc_expiry_date="", days_to_expiry=float("nan"), risk_rating=None)
+    records[2].update(doc_expiry_date="2026-01-01T00:00:00", days_to_expiry="not a number")
+    return {"generated_at": "2025-09-04T16:10:46", "records": records}
+
+
+def main():
+    table = build_table(mixed_payload())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "dashboard_data.parquet"
+        pq.write_table(table, path, compression="zstd")
+        loaded = pq.read_table(path)
+
+    assert loaded.schema.equals(PARQUET_SCHEMA, check_metadata=False), loaded.schema
+    assert loaded.num_rows == 200
+    rows = loaded.slice(0, 3).to_pylist()
+    assert rows[0]["customer_id"] == "123" and rows[0]["customer_name"] is None
+    assert rows[0]["days_to_expiry"] == 12 and rows[0]["bucket_code"] is None
+    assert rows[1]["doc_expiry_date"] is None and rows[1]["days_to_expiry"] is None
+    assert rows[2]["doc_expiry_date"].isoformat() == "2026-01-01" and rows[2]["days_to_expiry"] is None
+    assert len(loaded.column("kyc_document_type").combine_chunks().dictionary) == 200
+    print("Parquet export handled the mixed-type payload.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,31 +3,105 @@ import json
 import re
 from pathlib import Path
 
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+_DASHBOARD_RE = re.compile(
+    r'<script[^>]*id=["\\\']dashboard-data["\\\'][^>]*>(.*?)</script>',
+    flags=re.DOTALL | re.IGNORECASE,
+)
+
+# Keep in sync with BUCKET_ORDER in app.py: bucket_code indexes into it.
+BUCKET_ORDER = ["Expired", "0-30 days", "31-60 days", "61-90 days", "90+ days"]
+_BUCKET_EDGES = np.array([0, 31, 61, 91])
+PARQUET_SCHEMA = pa.schema(
+    [
+        ("customer_id", pa.string()),
+        ("customer_name", pa.string()),
+        ("risk_rating", pa.dictionary(pa.int32(), pa.string())),
+        ("kyc_document_type", pa.dictionary(pa.int32(), pa.string())),
+        ("doc_expiry_date", pa.date32()),
+        ("days_to_expiry", pa.int64()),
+        ("expiry_bucket", pa.dictionary(pa.int32(), pa.string())),
+        ("relationship_manager", pa.dictionary(pa.int32(), pa.string())),
+        ("bucket_code", pa.int8()),
+    ]
+)
+
+
+def bucketize(days: np.ndarray) -> np.ndarray:
+    codes = np.searchsorted(_BUCKET_EDGES, days, side="right").astype(np.int8)
+    codes[np.isnan(days)] = -1
+    return codes
+
+
+def _string_array(values: list) -> pa.Array:
+    # Same coercion as app.py's loader: any scalar becomes its text, missing values become nulls.
+    return pa.array(pd.Series(values, dtype=object).astype("string"), from_pandas=True).cast(pa.string())
+
+
+def build_table(data: dict) -> pa.Table:
+    records = data.get("records", [])
+    columns = {name: [rec.get(name) for rec in records] for name in PARQUET_SCHEMA.names}
+    arrays = {}
+    for field in PARQUET_SCHEMA:
+        if pa.types.is_string(field.type):
+            arrays[field.name] = _string_array(columns[field.name])
+        elif pa.types.is_dictionary(field.type):
+            arrays[field.name] = _string_array(columns[field.name]).dictionary_encode()
+    # Parse as leniently as the JSON loader in app.py: unparseable values become nulls.
+    dates = pd.to_datetime(pd.Series(columns["doc_expiry_date"], dtype=object), errors="coerce", format="mixed")
+    arrays["doc_expiry_date"] = pa.array(dates).cast(pa.date32())
+    days = pd.to_numeric(pd.Series(columns["days_to_expiry"], dtype=object), errors="coerce")
+    days = days.replace([np.inf, -np.inf], np.nan).round()
+    arrays["days_to_expiry"] = pa.array(days, from_pandas=True).cast(pa.int64())
+    arrays["bucket_code"] = pa.array(columns["bucket_code"], pa.int8())
+    # The dashboard header fields travel as schema metadata.
+    metadata = {key: str(data[key]) for key in ("generated_at", "input_file") if data.get(key)}
+    schema = PARQUET_SCHEMA.with_metadata(metadata)
+    return pa.Table.from_arrays([arrays[name] for name in schema.names], schema=schema)
+
 
 def extract_data(source: Path, target: Path) -> None:
     html = source.read_text(encoding="utf-8")
-    match = re.search(
-        r'<script[^>]*id=["\\\']dashboard-data["\\\'][^>]*>(.*?)</script>',
-        html,
-        flags=re.DOTALL | re.IGNORECASE,
-    )
+    match = _DASHBOARD_RE.search(html)
     if not match:
         raise ValueError("Could not locate the dashboard-data script block in the HTML.")
     payload = match.group(1).strip()
-    data = json.loads(payload)
-    target.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    try:
+        data = orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        # orjson rejects the NaN/Infinity tokens that json.dumps writes by default.
+        data = json.loads(payload)
+    records = data.get("records", [])
+    days = pd.to_numeric(pd.Series([rec.get("days_to_expiry") for rec in records], dtype=object), errors="coerce")
+    for rec, code in zip(records, bucketize(days.to_numpy(dtype=float)).tolist()):
+        # Only emit a code that reproduces the stored label; app.py falls back to the labels otherwise.
+        rec["bucket_code"] = code if code >= 0 and BUCKET_ORDER[code] == rec.get("expiry_bucket") else None
+    if isinstance(data.get("schema"), list) and "bucket_code" not in data["schema"]:
+        data["schema"].append("bucket_code")
+    if target.suffix == ".json":
+        target.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        pq.write_table(build_table(data), target, compression="zstd")
     print(f"Wrote {target} with {len(data.get('records', []))} records.")
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Extract dashboard JSON from the provided HTML file.")
+    parser = argparse.ArgumentParser(description="Extract dashboard data from the provided HTML file.")
     parser.add_argument("source", type=Path, help="Path to the HTML file containing the dashboard-data script tag.")
     parser.add_argument(
         "-o",
         "--output",
         type=Path,
-        default=Path(__file__).resolve().parent.parent / "data" / "dashboard_data.json",
-        help="Where to write the extracted JSON (default: data/dashboard_data.json).",
+        default=Path(__file__).resolve().parent.parent / "data" / "dashboard_data.parquet",
+        help=(
+            "Where to write the extracted data (default: data/dashboard_data.parquet). "
+            "A .json path writes the raw JSON payload instead."
+        ),
     )
     args = parser.parse_args()
     extract_data(args.source, args.output)